@@ -1,39 +1,135 @@
 import streamlit as st
 import sqlite3
+import threading
+import time
 import pandas as pd
-from datetime import datetime
-from uuid import uuid4
+from datetime import datetime, timedelta
 
 # --- 1. CONFIGURAÇÕES E CONSTANTES ---
 DB_NAME = 'reparos.db'
+PARSE_EPOCH = {'unit': 's'}  # Conversão dos horários (já em hora local) no read_sql_query
+COLUNAS_ADICIONADAS = [('tipo_retrabalho', 'TEXT'), ('shop', 'TEXT')]  # Colunas ausentes em bancos antigos
+COLUNAS_VISUALIZAR = ['VIN', 'Operador', 'Tipo Retrabalho', 'Shop', 'Data', 'Início', 'Fim', 'Duração (min)']
+# Só insere se o VIN (último parâmetro) não tiver reparo em aberto; atômico mesmo sem o índice uq_open_vin
+SQL_INSERIR_REPARO = """
+    INSERT INTO registros (vin, operador_id, tipo_retrabalho, shop, hora_inicio)
+    SELECT ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM registros WHERE vin = ? AND hora_fim IS NULL)
+"""
 
 # --- 2. FUNÇÕES DO BANCO DE DADOS (SQLite) ---
+@st.cache_resource(show_spinner=False)
+def get_conn():
+    """Retorna a conexão SQLite compartilhada entre os reruns do Streamlit."""
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+@st.cache_resource(show_spinner=False)
+def get_write_lock():
+    """Lock que serializa as escritas feitas pela conexão compartilhada."""
+    return threading.Lock()
+
+@st.cache_resource(show_spinner=False)
 def init_db():
-    """Cria a tabela de reparos se ela não existir."""
-    conn = sqlite3.connect(DB_NAME)
+    """Cria a tabela de reparos se ela não existir (executado uma vez por processo)."""
+    conn = get_conn()
     c = conn.cursor()
+    # Horários em segundos desde a época (UTC); id usa o rowid do SQLite
     c.execute("""
         CREATE TABLE IF NOT EXISTS registros (
-            id TEXT PRIMARY KEY,
+            id INTEGER PRIMARY KEY,
             vin TEXT NOT NULL,
             operador_id TEXT,
             tipo_retrabalho TEXT,
             shop TEXT,
-            hora_inicio TEXT,
-            hora_fim TEXT
+            hora_inicio INTEGER NOT NULL,
+            hora_fim INTEGER
         )
     """)
     # Adiciona as novas colunas se não existirem (para compatibilidade com banco existente)
+    colunas = {row[1]: row[2] for row in c.execute("PRAGMA table_info(registros)")}
+    for nome, tipo in COLUNAS_ADICIONADAS:
+        if nome not in colunas:
+            c.execute(f"ALTER TABLE registros ADD COLUMN {nome} {tipo}")
+    if colunas['id'].upper() == 'TEXT':
+        _migrar_para_epoch(conn)
+    # Índices para as buscas por VIN em aberto e pelos filtros de data
+    c.execute("CREATE INDEX IF NOT EXISTS idx_vin_open ON registros(vin, hora_fim, hora_inicio DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_open ON registros(hora_fim) WHERE hora_fim IS NULL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_hora_inicio ON registros(hora_inicio)")
+    _criar_indice_unico(c)
+    conn.commit()
+
+def _criar_indice_unico(c):
+    """Cria o índice que garante no máximo um reparo em aberto por VIN, se ainda não existir."""
     try:
-        c.execute("ALTER TABLE registros ADD COLUMN tipo_retrabalho TEXT")
-    except sqlite3.OperationalError:
-        pass  # Coluna já existe
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_open_vin ON registros(vin) WHERE hora_fim IS NULL")
+    except sqlite3.IntegrityError:
+        # Banco legado com VIN duplicado em aberto: o INSERT condicional continua barrando
+        # novos duplicados e a criação é tentada de novo a cada finalização
+        pass
+
+def _migrar_para_epoch(conn):
+    """Converte o schema antigo (id UUID e horários TEXT) para id INTEGER e horários epoch.
+
+    Linhas com hora_inicio vazia ou ilegível (ou hora_fim ilegível) não são migradas;
+    ficam preservadas na tabela registros_invalidos para conferência.
+    """
+    c = conn.cursor()
+    c.execute("BEGIN")
     try:
-        c.execute("ALTER TABLE registros ADD COLUMN shop TEXT")
-    except sqlite3.OperationalError:
-        pass  # Coluna já existe
-    conn.commit()
-    conn.close()
+        c.execute("DROP TABLE IF EXISTS registros_v2")
+        c.execute("""
+            CREATE TABLE registros_v2 (
+                id INTEGER PRIMARY KEY,
+                vin TEXT NOT NULL,
+                operador_id TEXT,
+                tipo_retrabalho TEXT,
+                shop TEXT,
+                hora_inicio INTEGER NOT NULL,
+                hora_fim INTEGER
+            )
+        """)
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS registros_invalidos AS
+            SELECT * FROM registros
+            WHERE strftime('%s', hora_inicio) IS NULL
+               OR (hora_fim IS NOT NULL AND strftime('%s', hora_fim) IS NULL)
+        """)
+        # Os horários antigos foram gravados em hora local; 'utc' converte para a época UTC
+        c.execute("""
+            INSERT INTO registros_v2 (vin, operador_id, tipo_retrabalho, shop, hora_inicio, hora_fim)
+            SELECT vin, operador_id, tipo_retrabalho, shop,
+                   CAST(strftime('%s', hora_inicio, 'utc') AS INTEGER),
+                   CAST(strftime('%s', hora_fim, 'utc') AS INTEGER)
+            FROM registros
+            WHERE strftime('%s', hora_inicio) IS NOT NULL
+              AND (hora_fim IS NULL OR strftime('%s', hora_fim) IS NOT NULL)
+            ORDER BY hora_inicio
+        """)
+        c.execute("DROP TABLE registros")
+        c.execute("ALTER TABLE registros_v2 RENAME TO registros")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+def _sql_hora_local(coluna):
+    """Expressão SQL que leva `coluna` (epoch UTC) para a hora local, ainda em segundos.
+
+    Usa as regras de fuso do sistema (com horário de verão), as mesmas de
+    `datetime.fromtimestamp` e do modificador 'localtime' nos relatórios.
+    """
+    return f"CAST(strftime('%s', {coluna}, 'unixepoch', 'localtime') AS INTEGER)"
+
+def _inicio_do_dia(data):
+    """Retorna o início (00:00 local) do dia informado em segundos desde a época."""
+    return int(datetime.combine(data, datetime.min.time()).timestamp())
 
 def validar_vin(vin):
     """Valida se o VIN não está vazio."""
@@ -42,10 +138,10 @@ def validar_vin(vin):
     vin_limpo = vin.upper().strip()
     return True, vin_limpo
 
+@st.cache_data(ttl=5, show_spinner=False)
 def verificar_reparo_aberto(vin):
     """Verifica se existe reparo em aberto para o VIN."""
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_conn()
     c = conn.cursor()
     c.execute("""
         SELECT id, operador_id, hora_inicio FROM registros 
@@ -53,9 +149,7 @@ def verificar_reparo_aberto(vin):
         ORDER BY hora_inicio DESC 
         LIMIT 1
     """, (vin.upper(),))
-    resultado = c.fetchone()
-    conn.close()
-    return resultado
+    return c.fetchone()
 
 def iniciar_reparo(vin, operador_id, tipo_retrabalho=None, shop=None):
     """Registra o início do reparo no banco de dados."""
@@ -64,28 +158,28 @@ def iniciar_reparo(vin, operador_id, tipo_retrabalho=None, shop=None):
     if not vin_valido:
         return False, vin_formatado
     
-    # Verifica se já existe reparo em aberto
-    reparo_aberto = verificar_reparo_aberto(vin_formatado)
-    if reparo_aberto:
-        hora_inicio_existente = datetime.strptime(reparo_aberto[2], '%Y-%m-%d %H:%M:%S')
-        tempo_decorrido = datetime.now() - hora_inicio_existente
-        return False, f"Já existe um reparo em aberto para este VIN iniciado há {int(tempo_decorrido.total_seconds() / 60)} minutos. Finalize o reparo anterior primeiro."
-    
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_conn()
     c = conn.cursor()
-    reparo_id = str(uuid4())
-    hora_inicio = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    hora_inicio = int(time.time())
 
+    # O INSERT condicional (e o índice uq_open_vin) rejeita um segundo reparo em aberto para o mesmo VIN
     try:
-        c.execute("INSERT INTO registros (id, vin, operador_id, tipo_retrabalho, shop, hora_inicio) VALUES (?, ?, ?, ?, ?, ?)",
-                  (reparo_id, vin_formatado, operador_id.strip().upper(), tipo_retrabalho.strip() if tipo_retrabalho else None, shop if shop else None, hora_inicio))
-        conn.commit()
-        return True, reparo_id
+        with get_write_lock(), conn:
+            c.execute(SQL_INSERIR_REPARO,
+                      (vin_formatado, operador_id.strip().upper(), tipo_retrabalho.strip() if tipo_retrabalho else None, shop if shop else None, hora_inicio, vin_formatado))
+            if c.rowcount == 0:
+                raise sqlite3.IntegrityError("reparo em aberto")
+            reparo_id = c.lastrowid
+    except sqlite3.IntegrityError:
+        reparo_aberto = verificar_reparo_aberto(vin_formatado)
+        if not reparo_aberto:
+            return False, "Já existe um reparo em aberto para este VIN. Finalize o reparo anterior primeiro."
+        tempo_decorrido = timedelta(seconds=time.time() - reparo_aberto[2])
+        return False, f"Já existe um reparo em aberto para este VIN iniciado há {int(tempo_decorrido.total_seconds() / 60)} minutos. Finalize o reparo anterior primeiro."
     except sqlite3.Error as e:
         return False, f"Erro ao iniciar: {e}"
-    finally:
-        conn.close()
+    invalidate()
+    return True, reparo_id
 
 def finalizar_reparo(vin):
     """Registra a hora de fim para o último reparo INCOMPLETO desse VIN."""
@@ -94,42 +188,93 @@ def finalizar_reparo(vin):
     if not vin_valido:
         return False, vin_formatado, None, None
     
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_conn()
     c = conn.cursor()
-    hora_fim = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    hora_fim = int(time.time())
 
-    # Encontra o reparo mais recente para este VIN que ainda não foi finalizado
-    c.execute("""
-        SELECT id, hora_inicio, operador_id FROM registros 
-        WHERE vin = ? AND hora_fim IS NULL 
-        ORDER BY hora_inicio DESC 
-        LIMIT 1
-    """, (vin_formatado,))
-    
-    reparo_incompleto = c.fetchone()
-    
-    if reparo_incompleto:
+    with get_write_lock(), conn:
+        # Encontra o reparo mais recente para este VIN que ainda não foi finalizado
+        c.execute("""
+            SELECT id, hora_inicio, operador_id FROM registros 
+            WHERE vin = ? AND hora_fim IS NULL 
+            ORDER BY hora_inicio DESC 
+            LIMIT 1
+        """, (vin_formatado,))
+        
+        reparo_incompleto = c.fetchone()
+        
+        if not reparo_incompleto:
+            return False, "Nenhum reparo em aberto encontrado para este VIN.", None, None
+        
         reparo_id = reparo_incompleto[0]
-        hora_inicio = datetime.strptime(reparo_incompleto[1], '%Y-%m-%d %H:%M:%S')
         operador_id = reparo_incompleto[2]
-        hora_fim_dt = datetime.strptime(hora_fim, '%Y-%m-%d %H:%M:%S')
-        duracao = hora_fim_dt - hora_inicio
+        duracao = timedelta(seconds=hora_fim - reparo_incompleto[1])
         
         c.execute("UPDATE registros SET hora_fim = ? WHERE id = ?", (hora_fim, reparo_id))
-        conn.commit()
-        conn.close()
-        return True, reparo_id, duracao, operador_id
-    else:
-        conn.close()
-        return False, "Nenhum reparo em aberto encontrado para este VIN.", None, None
+        _criar_indice_unico(c)
+    
+    invalidate()
+    return True, reparo_id, duracao, operador_id
 
-def get_registros(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None, filtro_data_fim=None, apenas_completos=False):
-    """Retorna todos os registros para visualização e cálculo."""
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
+def iniciar_reparos_bulk(rows):
+    """Registra vários inícios de reparo em uma única transação (ex.: importação de CSV).
+
+    Cada item de `rows` é (vin, operador_id, tipo_retrabalho, shop, hora_inicio), com
+    hora_inicio em segundos desde a época. Se algum VIN já tiver reparo em aberto ou
+    aparecer mais de uma vez na lista, nenhuma linha é gravada.
+    """
+    dados = []
+    for vin, operador_id, tipo_retrabalho, shop, hora_inicio in rows:
+        vin_valido, vin_formatado = validar_vin(vin)
+        if not vin_valido:
+            return False, vin_formatado
+        dados.append((vin_formatado, operador_id.strip().upper(), tipo_retrabalho.strip() if tipo_retrabalho else None, shop if shop else None, int(hora_inicio), vin_formatado))
     
-    query = "SELECT id, vin, operador_id, tipo_retrabalho, shop, hora_inicio, hora_fim FROM registros WHERE 1=1"
+    conn = get_conn()
+    try:
+        with get_write_lock(), conn:
+            # Cada INSERT condicional enxerga as linhas anteriores do lote; rowcount menor indica duplicado
+            c = conn.executemany(SQL_INSERIR_REPARO, dados)
+            if c.rowcount != len(dados):
+                raise sqlite3.IntegrityError("reparo em aberto")
+    except sqlite3.IntegrityError:
+        return False, "Há VINs com reparo em aberto (ou repetidos na lista). Nenhum reparo foi iniciado."
+    except sqlite3.Error as e:
+        return False, f"Erro ao iniciar: {e}"
+    invalidate()
+    return True, len(dados)
+
+def finalizar_reparos_bulk(vins):
+    """Finaliza os reparos em aberto dos VINs informados em uma única transação.
+
+    Retorna quantos reparos foram finalizados; VINs sem reparo em aberto são ignorados.
+    """
+    hora_fim = int(time.time())
+    dados = []
+    for vin in vins:
+        vin_valido, vin_formatado = validar_vin(vin)
+        if not vin_valido:
+            return False, vin_formatado
+        dados.append((hora_fim, vin_formatado))
+    
+    conn = get_conn()
+    try:
+        with get_write_lock(), conn:
+            c = conn.executemany("UPDATE registros SET hora_fim = ? WHERE vin = ? AND hora_fim IS NULL", dados)
+            total = c.rowcount
+            _criar_indice_unico(c)
+    except sqlite3.Error as e:
+        return False, f"Erro ao finalizar: {e}"
+    invalidate()
+    return True, total
+
+@st.cache_data(ttl=30, max_entries=64, show_spinner=False)
+def _fetch_raw(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None, filtro_data_fim=None, apenas_completos=False):
+    """Executa a consulta de registros e retorna o resultado com os horários já em hora local."""
+    conn = get_conn()
+    
+    query = (f"SELECT id, vin, operador_id, tipo_retrabalho, shop, {_sql_hora_local('hora_inicio')} AS inicio_local, "
+             f"{_sql_hora_local('hora_fim')} AS fim_local, hora_fim - hora_inicio AS duracao_seg FROM registros WHERE 1=1")
     params = []
     
     if filtro_operador:
@@ -138,32 +283,33 @@ def get_registros(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None
     if filtro_vin:
         query += " AND vin = ?"
         params.append(filtro_vin.upper())
+    # Compara direto com hora_inicio (sem DATE()) para que o índice seja usado
     if filtro_data_inicio:
-        query += " AND DATE(hora_inicio) >= ?"
-        params.append(filtro_data_inicio)
+        query += " AND hora_inicio >= ?"
+        params.append(_inicio_do_dia(filtro_data_inicio))
     if filtro_data_fim:
-        query += " AND DATE(hora_inicio) <= ?"
-        params.append(filtro_data_fim)
+        query += " AND hora_inicio < ?"
+        params.append(_inicio_do_dia(filtro_data_fim + timedelta(days=1)))
     if apenas_completos:
         query += " AND hora_fim IS NOT NULL"
     
     query += " ORDER BY hora_inicio DESC"
     
-    df = pd.read_sql_query(query, conn, params=params if params else None)
-    conn.close()
-    
+    return pd.read_sql_query(query, conn, params=params if params else None,
+                             parse_dates={'inicio_local': PARSE_EPOCH, 'fim_local': PARSE_EPOCH})
+
+@st.cache_data(ttl=30, max_entries=64, show_spinner=False)
+def _postprocess(df):
+    """Calcula as colunas de duração e data e renomeia as colunas para o display."""
     if df.empty:
         return df
     
-    # Processamento para cálculo do tempo
-    df['hora_inicio'] = pd.to_datetime(df['hora_inicio'])
-    df['hora_fim'] = pd.to_datetime(df['hora_fim'], errors='coerce')
-    df['duracao'] = df['hora_fim'] - df['hora_inicio']
-    df['duracao_minutos'] = df['duracao'].dt.total_seconds() / 60
-    df['duracao_horas'] = df['duracao_minutos'] / 60
+    # A duração (s) já vem calculada pelo SQLite; NULL para reparos em aberto
+    df['duracao_minutos'] = df['duracao_seg'] / 60
+    df['duracao_horas'] = df['duracao_seg'] / 3600
     
     # Formatação de data
-    df['data'] = df['hora_inicio'].dt.date
+    df['data'] = df['inicio_local'].dt.date
     
     # Seleciona e renomeia as colunas para o display
     colunas_display = {
@@ -171,8 +317,8 @@ def get_registros(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None
         'operador_id': 'Operador',
         'tipo_retrabalho': 'Tipo Retrabalho',
         'shop': 'Shop',
-        'hora_inicio': 'Início',
-        'hora_fim': 'Fim',
+        'inicio_local': 'Início',
+        'fim_local': 'Fim',
         'duracao_minutos': 'Duração (min)',
         'duracao_horas': 'Duração (h)',
         'data': 'Data'
@@ -182,36 +328,156 @@ def get_registros(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None
     
     return df_display
 
+def get_registros(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None, filtro_data_fim=None, apenas_completos=False):
+    """Retorna todos os registros para visualização e cálculo (filtros de data como `date`)."""
+    return _postprocess(_fetch_raw(filtro_operador, filtro_vin, filtro_data_inicio, filtro_data_fim, apenas_completos))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def gerar_csv_registros(filtro_operador=None, filtro_vin=None, filtro_data_inicio=None, filtro_data_fim=None, apenas_completos=False):
+    """Retorna o CSV (bytes) dos registros filtrados, com as colunas da aba de visualização."""
+    df = get_registros(filtro_operador, filtro_vin, filtro_data_inicio, filtro_data_fim, apenas_completos)
+    colunas_exibir = [col for col in COLUNAS_VISUALIZAR if col in df.columns]
+    return df[colunas_exibir].to_csv(index=False).encode('utf-8-sig')
+
+@st.cache_data(ttl=30, max_entries=64, show_spinner=False)
 def get_reparos_abertos():
-    """Retorna todos os reparos que ainda não foram finalizados."""
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
-    df = pd.read_sql_query("""
-        SELECT vin, operador_id, tipo_retrabalho, shop, hora_inicio 
+    """Retorna todos os reparos que ainda não foram finalizados.
+
+    O tempo decorrido não é calculado aqui para que o cache continue válido;
+    use `calcular_tempo_decorrido` sobre o resultado.
+    """
+    conn = get_conn()
+    df = pd.read_sql_query(f"""
+        SELECT vin, operador_id, tipo_retrabalho, shop, {_sql_hora_local('hora_inicio')} AS inicio_local 
         FROM registros 
         WHERE hora_fim IS NULL 
         ORDER BY hora_inicio DESC
-    """, conn)
-    conn.close()
-    
-    if df.empty:
-        return df
-    
-    df['hora_inicio'] = pd.to_datetime(df['hora_inicio'])
-    df['tempo_decorrido'] = datetime.now() - df['hora_inicio']
-    df['tempo_decorrido_min'] = df['tempo_decorrido'].dt.total_seconds() / 60
+    """, conn, parse_dates={'inicio_local': PARSE_EPOCH})
     
     return df.rename(columns={
         'vin': 'VIN',
         'operador_id': 'Operador',
         'tipo_retrabalho': 'Tipo Retrabalho',
         'shop': 'Shop',
-        'hora_inicio': 'Início',
-        'tempo_decorrido_min': 'Tempo Decorrido (min)'
+        'inicio_local': 'Início'
     })
 
+@st.cache_data(ttl=60, show_spinner=False)
+def get_resumo_por_operador():
+    """Retorna o resumo dos reparos finalizados por operador, já arredondado para o display."""
+    conn = get_conn()
+    return pd.read_sql_query("""
+        SELECT operador_id AS "Operador",
+               COUNT(*) AS "Total Reparos",
+               ROUND(AVG(dur) / 60.0, 2) AS "Tempo Médio (min)",
+               ROUND(SUM(dur) / 60.0, 2) AS "Tempo Total (min)",
+               COUNT(vin) AS "Total VINs",
+               ROUND(SUM(dur) / 3600.0, 2) AS "Tempo Total (h)"
+        FROM (
+            SELECT operador_id, vin, hora_fim - hora_inicio AS dur
+            FROM registros
+            WHERE hora_fim IS NOT NULL
+        )
+        GROUP BY operador_id
+    """, conn).set_index('Operador')
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_reparos_por_data():
+    """Retorna a quantidade de reparos finalizados por dia de início."""
+    conn = get_conn()
+    df = pd.read_sql_query("""
+        SELECT DATE(hora_inicio, 'unixepoch', 'localtime') AS Data, COUNT(*) AS total_reparos
+        FROM registros
+        WHERE hora_fim IS NOT NULL
+        GROUP BY Data
+        ORDER BY Data
+    """, conn)
+    df['Data'] = pd.to_datetime(df['Data'], format='%Y-%m-%d')
+    return df.set_index('Data')['total_reparos']
+
+def calcular_tempo_decorrido(df_abertos):
+    """Adiciona a coluna de tempo decorrido (fora do cache, sempre atualizada)."""
+    if df_abertos.empty:
+        return df_abertos
+    df_abertos = df_abertos.copy()
+    tempo_decorrido = datetime.now() - df_abertos['Início']
+    df_abertos['Tempo Decorrido (min)'] = tempo_decorrido.dt.total_seconds() / 60
+    return df_abertos
+
+def invalidate():
+    """Limpa o cache das consultas para que as gravações apareçam imediatamente."""
+    _fetch_raw.clear()
+    _postprocess.clear()
+    get_reparos_abertos.clear()
+    get_resumo_por_operador.clear()
+    get_reparos_por_data.clear()
+    gerar_csv_registros.clear()
+    verificar_reparo_aberto.clear()
+
 
 # --- 3. INTERFACE DO STREAMLIT ---
+@st.fragment
+def _aba_relatorios():
+    """Conteúdo da aba de relatórios; o histórico por VIN reexecuta só esta aba ao ser usado."""
+    st.header("Relatórios e Análises")
+    
+    resumo_operador = get_resumo_por_operador()
+    
+    if resumo_operador.empty:
+        st.info("Nenhum reparo finalizado ainda para gerar relatórios.")
+    else:
+        # Gráficos (séries tiradas do resumo já agregado no SQL)
+        col_graf1, col_graf2 = st.columns(2)
+        
+        with col_graf1:
+            st.subheader("📊 Reparos por Operador")
+            reparos_por_operador = resumo_operador['Total Reparos'].sort_values(ascending=False)
+            if not reparos_por_operador.empty:
+                st.bar_chart(reparos_por_operador)
+        
+        with col_graf2:
+            st.subheader("⏱️ Tempo Médio por Operador")
+            tempo_medio_operador = resumo_operador['Tempo Médio (min)'].sort_values(ascending=False)
+            if not tempo_medio_operador.empty:
+                st.bar_chart(tempo_medio_operador)
+        
+        st.markdown("---")
+        
+        # Gráfico de linha - Reparos ao longo do tempo
+        st.subheader("📈 Reparos ao Longo do Tempo")
+        reparos_por_data = get_reparos_por_data()
+        if not reparos_por_data.empty:
+            st.line_chart(reparos_por_data)
+        
+        st.markdown("---")
+        
+        # Tabela de resumo por operador
+        st.subheader("📋 Resumo por Operador")
+        st.dataframe(resumo_operador, use_container_width=True)
+        
+        # Histórico por VIN
+        st.markdown("---")
+        st.subheader("🔍 Histórico por VIN")
+        vin_busca = st.text_input("Digite o VIN para ver o histórico", key="hist_vin", placeholder="VIN")
+        
+        if vin_busca:
+            vin_busca = vin_busca.upper().strip()
+            df_vin = get_registros(filtro_vin=vin_busca, apenas_completos=False)
+            if not df_vin.empty:
+                colunas_vin = ['Operador', 'Tipo Retrabalho', 'Shop', 'Data', 'Início', 'Fim', 'Duração (min)']
+                colunas_vin = [col for col in colunas_vin if col in df_vin.columns]
+                st.dataframe(df_vin[colunas_vin], use_container_width=True, hide_index=True)
+                
+                # Estatísticas do VIN
+                col_vin1, col_vin2 = st.columns(2)
+                with col_vin1:
+                    st.metric("Total de Reparos", len(df_vin))
+                with col_vin2:
+                    tempo_total_vin = df_vin['Duração (min)'].dropna().sum()
+                    st.metric("Tempo Total", f"{tempo_total_vin:.1f} min")
+            else:
+                st.warning(f"Nenhum registro encontrado para o VIN {vin_busca}.")
+
 def app():
     st.set_page_config(
         page_title="Registro de Tempo de Reparo", 
@@ -310,7 +576,7 @@ def app():
                     # Verifica se já existe reparo em aberto
                     reparo_aberto = verificar_reparo_aberto(vin_start_upper)
                     if reparo_aberto:
-                        hora_inicio_existente = datetime.strptime(reparo_aberto[2], '%Y-%m-%d %H:%M:%S')
+                        hora_inicio_existente = datetime.fromtimestamp(reparo_aberto[2])
                         tempo_decorrido = datetime.now() - hora_inicio_existente
                         st.warning(f"⚠️ Já existe um reparo em aberto para este VIN iniciado há {int(tempo_decorrido.total_seconds() / 60)} minutos.")
         
@@ -375,7 +641,7 @@ def app():
                 vin_end_upper = vin_end_atual.upper().strip()
                 reparo_aberto = verificar_reparo_aberto(vin_end_upper)
                 if reparo_aberto:
-                    hora_inicio_existente = datetime.strptime(reparo_aberto[2], '%Y-%m-%d %H:%M:%S')
+                    hora_inicio_existente = datetime.fromtimestamp(reparo_aberto[2])
                     tempo_decorrido = datetime.now() - hora_inicio_existente
                     minutos = int(tempo_decorrido.total_seconds() / 60)
                     horas = minutos // 60
@@ -410,19 +676,18 @@ def app():
         
         apenas_completos = st.checkbox("Mostrar apenas reparos finalizados", value=True, key="check_completos")
         
-        df_registros = get_registros(
+        filtros = dict(
             filtro_operador=filtro_operador if filtro_operador else None,
             filtro_vin=filtro_vin.upper() if filtro_vin else None,
-            filtro_data_inicio=filtro_data_inicio.strftime('%Y-%m-%d') if filtro_data_inicio else None,
-            filtro_data_fim=filtro_data_fim.strftime('%Y-%m-%d') if filtro_data_fim else None,
+            filtro_data_inicio=filtro_data_inicio,
+            filtro_data_fim=filtro_data_fim,
             apenas_completos=apenas_completos
         )
+        df_registros = get_registros(**filtros)
         
         if not df_registros.empty:
-            # Seleciona colunas para exibição
-            colunas_exibir = ['VIN', 'Operador', 'Tipo Retrabalho', 'Shop', 'Data', 'Início', 'Fim', 'Duração (min)']
-            # Remove colunas que não existem no dataframe
-            colunas_exibir = [col for col in colunas_exibir if col in df_registros.columns]
+            # Seleciona colunas para exibição (remove as que não existem no dataframe)
+            colunas_exibir = [col for col in COLUNAS_VISUALIZAR if col in df_registros.columns]
             df_exibir = df_registros[colunas_exibir]
             st.dataframe(df_exibir, use_container_width=True, hide_index=True)
             
@@ -448,7 +713,7 @@ def app():
                 
                 # Exportar CSV
                 st.markdown("---")
-                csv = df_exibir.to_csv(index=False).encode('utf-8-sig')
+                csv = gerar_csv_registros(**filtros)
                 st.download_button(
                     label="📥 Download dos Dados (CSV)",
                     data=csv,
@@ -466,7 +731,7 @@ def app():
         st.header("Reparos em Andamento")
         st.info("Lista de todos os reparos que foram iniciados mas ainda não foram finalizados.")
         
-        df_abertos = get_reparos_abertos()
+        df_abertos = calcular_tempo_decorrido(get_reparos_abertos())
         
         if not df_abertos.empty:
             # Seleciona apenas colunas relevantes
@@ -491,72 +756,7 @@ def app():
     
     # --- ABA 5: RELATÓRIOS ---
     with tab5:
-        st.header("Relatórios e Análises")
-        
-        df_registros = get_registros(apenas_completos=True)
-        
-        if df_registros.empty:
-            st.info("Nenhum reparo finalizado ainda para gerar relatórios.")
-        else:
-            # Gráficos
-            col_graf1, col_graf2 = st.columns(2)
-            
-            with col_graf1:
-                st.subheader("📊 Reparos por Operador")
-                reparos_por_operador = df_registros.groupby('Operador').size().sort_values(ascending=False)
-                if not reparos_por_operador.empty:
-                    st.bar_chart(reparos_por_operador)
-            
-            with col_graf2:
-                st.subheader("⏱️ Tempo Médio por Operador")
-                tempo_medio_operador = df_registros.groupby('Operador')['Duração (min)'].mean().sort_values(ascending=False)
-                if not tempo_medio_operador.empty:
-                    st.bar_chart(tempo_medio_operador)
-            
-            st.markdown("---")
-            
-            # Gráfico de linha - Reparos ao longo do tempo
-            st.subheader("📈 Reparos ao Longo do Tempo")
-            reparos_por_data = df_registros.groupby('Data').size()
-            if not reparos_por_data.empty:
-                st.line_chart(reparos_por_data)
-            
-            st.markdown("---")
-            
-            # Tabela de resumo por operador
-            st.subheader("📋 Resumo por Operador")
-            resumo_operador = df_registros.groupby('Operador').agg({
-                'Duração (min)': ['count', 'mean', 'sum'],
-                'VIN': 'count'
-            }).round(2)
-            
-            resumo_operador.columns = ['Total Reparos', 'Tempo Médio (min)', 'Tempo Total (min)', 'Total VINs']
-            resumo_operador['Tempo Total (h)'] = (resumo_operador['Tempo Total (min)'] / 60).round(2)
-            
-            st.dataframe(resumo_operador, use_container_width=True)
-            
-            # Histórico por VIN
-            st.markdown("---")
-            st.subheader("🔍 Histórico por VIN")
-            vin_busca = st.text_input("Digite o VIN para ver o histórico", key="hist_vin", placeholder="VIN")
-            
-            if vin_busca:
-                vin_busca = vin_busca.upper().strip()
-                df_vin = get_registros(filtro_vin=vin_busca, apenas_completos=False)
-                if not df_vin.empty:
-                    colunas_vin = ['Operador', 'Tipo Retrabalho', 'Shop', 'Data', 'Início', 'Fim', 'Duração (min)']
-                    colunas_vin = [col for col in colunas_vin if col in df_vin.columns]
-                    st.dataframe(df_vin[colunas_vin], use_container_width=True, hide_index=True)
-                    
-                    # Estatísticas do VIN
-                    col_vin1, col_vin2 = st.columns(2)
-                    with col_vin1:
-                        st.metric("Total de Reparos", len(df_vin))
-                    with col_vin2:
-                        tempo_total_vin = df_vin['Duração (min)'].dropna().sum()
-                        st.metric("Tempo Total", f"{tempo_total_vin:.1f} min")
-                else:
-                    st.warning(f"Nenhum registro encontrado para o VIN {vin_busca}.")
+        _aba_relatorios()
              
 if __name__ == "__main__":
     init_db()  # Garante que o banco de dados seja inicializado ao rodar o script